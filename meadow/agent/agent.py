@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from abc import abstractmethod
+from dataclasses import dataclass
 from typing import Callable
 
 from meadow.agent.schema import AgentMessage, AgentRole, ExecutorFunctionInput
@@ -102,16 +103,13 @@ class LLMAgentWithExecutors(LLMAgent):
         raise NotImplementedError
 
 
+@dataclass(slots=True)
 class SubTask:
     """Sub-task in a plan."""
 
     agent: Agent
     prompt: str
 
-    def __init__(self, agent: Agent, prompt: str):
-        self.agent = agent
-        self.prompt = prompt
-
 
 class LLMPlannerAgent(LLMAgent):
     """Agent that makes plan."""
@@ -1,13 +1,13 @@
 """SQL decomposer agent."""
 
+import hashlib
 import json
 import logging
 import re
-from queue import Queue
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass
 from typing import Callable
 
-from pydantic import BaseModel
-
 from meadow.agent.agent import (
     Agent,
     LLMPlannerAgent,
@@ -16,13 +16,14 @@ from meadow.agent.agent import (
 from meadow.agent.data_agents.text2sql import SQLGeneratorAgent
 from meadow.agent.schema import AgentMessage, ClientMessageRole, Commands
 from meadow.agent.utils import (
+    SchemaSystemPrompt,
     generate_llm_reply,
     print_message,
+    serialize_chat_messages,
 )
 from meadow.client.client import Client
-from meadow.client.schema import LLMConfig
+from meadow.client.schema import ChatResponse, LLMConfig
 from meadow.database.database import Database
-from meadow.database.serializer import serialize_as_list
 from meadow.history.message_history import MessageHistory
 
 logger = logging.getLogger(__name__)
@@ -39,8 +40,14 @@ Output the steps in enumerated format 1., 2., 3., etc.
 
 The last step must end with the phrase `The final attributes should be` followed by the final attributes that the user wants to get from the database."""
 
+_STEP_NUMBER_RE = re.compile(r"\n(\d+)\.\s+")
+
+# Max number of plans kept per decomposer; least recently used are dropped first
+MAX_PLAN_CACHE_SIZE = 128
+
 
-class SubTaskForParse(BaseModel):
+@dataclass(slots=True)
+class SubTaskForParse:
     """Sub-task in a plan used in executor."""
 
     agent_name: str
@@ -51,50 +58,60 @@ def parse_steps_numbers(input_str: str) -> list[str]:
     """
     Parse the given output structure using regular expressions.
     """
-    if "1. " not in input_str:
+    first_step_idx = input_str.find("1. ")
+    if first_step_idx == -1:
         raise ValueError(
             "The instructions does not contain any steps. Please output steps in 1., 2., 3., etc. format."
         )
-    text = "\n1. " + input_str.split("1. ", 1)[1]
-    pieces = re.split(
-        r"(\n\d+\.\s+)",
-        text,
-        flags=re.MULTILINE,
-    )
-    pieces = [p.strip() for p in pieces if p.strip()]
-    # pieces will be [#, instruction, #, instruction, ...]
+    text = "\n1. " + input_str[first_step_idx + len("1. ") :]
+    # Single pass over the step markers (\n#. ); each instruction runs until the next marker
+    markers = list(_STEP_NUMBER_RE.finditer(text))
     instructions = {}
-    cur_num = None
-    for piece in pieces:
-        piece = piece.strip()
-        try:
-            cur_num = int(re.match(r"(\d+)\.", piece.strip()).group(1))
-            continue
-        except Exception:
-            pass
-        assert cur_num is not None
-        instructions[cur_num] = piece.strip().replace("**", "")
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        instruction = text[marker.end() : end].strip()
+        if instruction:
+            instructions[int(marker.group(1))] = instruction.replace("**", "")
     return [instructions[i] for i in sorted(instructions.keys())]
 
 
+def parse_subtasks(
+    message: str,
+    agent_to_use: str = "SQLGenerator",
+) -> list[SubTaskForParse]:
+    """Extract the sub-tasks of the plan from the response."""
+    return [
+        SubTaskForParse(agent_name=agent_to_use, prompt=instruction)
+        for instruction in parse_steps_numbers(message)
+    ]
+
+
 def parse_plan(
     message: str,
     agent_name: str,
     agent_to_use: str = "SQLGenerator",
 ) -> AgentMessage:
     """Extract the plan from the response."""
-    parsed_steps = parse_steps_numbers(message)
-    plan: list[SubTaskForParse] = []
-    for instruction in parsed_steps:
-        plan.append(SubTaskForParse(agent_name=agent_to_use, prompt=instruction))
+    plan = parse_subtasks(message, agent_to_use=agent_to_use)
     return AgentMessage(
-        content=json.dumps([m.model_dump() for m in plan]),
+        content=json.dumps([asdict(m) for m in plan]),
         display_content=message,
         sending_agent=agent_name,
         requires_response=False,
     )
 
 
+def get_plan_cache_key(system_message: str, messages: list[AgentMessage]) -> str:
+    """Hash the system message and chat history into a plan cache key."""
+    hasher = hashlib.blake2b(system_message.encode())
+    for message in messages:
+        hasher.update(b"\0")
+        hasher.update(message.agent_role.value.encode())
+        hasher.update(b"\0")
+        hasher.update((message.content or "").encode())
+    return hasher.hexdigest()
+
+
 class SQLDecomposerAgent(LLMPlannerAgent):
     """Agent that generates a plan for subsql tasks."""
 
@@ -115,10 +132,16 @@ class SQLDecomposerAgent(LLMPlannerAgent):
         self._database = database
         self._system_prompt = system_prompt
         self._messages = MessageHistory()
-        self._plan: Queue[SubTask] = Queue()
+        self._plan: deque[SubTask] = deque()
         self._overwrite_cache = overwrite_cache
         self._llm_callback = llm_callback
         self._silent = silent
+        self._schema_system_prompt = SchemaSystemPrompt(self._system_prompt)
+        # Responses, replies and parsed plans from previous LLM calls keyed by
+        # get_plan_cache_key. Only used if the client caches responses.
+        self._plan_cache: OrderedDict[
+            str, tuple[ChatResponse, AgentMessage, list[SubTaskForParse]]
+        ] = OrderedDict()
 
         if available_agents is None:
             available_agents = [
@@ -148,10 +171,7 @@ class SQLDecomposerAgent(LLMPlannerAgent):
     @property
     def system_message(self) -> str:
         """Get the system message."""
-        serialized_schema = serialize_as_list(self._database.tables)
-        return self._system_prompt.format(
-            serialized_schema=serialized_schema,
-        )
+        return self._schema_system_prompt.format(self._database)
 
     @property
     def available_agents(self) -> dict[str, Agent]:
@@ -162,9 +182,9 @@ class SQLDecomposerAgent(LLMPlannerAgent):
         self,
     ) -> SubTask:
         """Move to the next agent in the task plan."""
-        if self._plan.empty():
+        if not self._plan:
             return None
-        subtask = self._plan.get()
+        subtask = self._plan.popleft()
         # When moving on, reset executors to allow for new attempts
         if subtask.agent.executors:
             for ex in subtask.agent.executors:
@@ -214,8 +234,11 @@ class SQLDecomposerAgent(LLMPlannerAgent):
             agent=sender, agent_role=ClientMessageRole.RECEIVER, message=message
         )
 
+        messages, serialized_messages = self._messages.get_messages_with_serialized(
+            sender
+        )
         reply = await self.generate_reply(
-            messages=self._messages.get_messages(sender), sender=sender
+            messages=messages, sender=sender, serialized_messages=serialized_messages
         )
         await self.send(reply, sender)
 
@@ -223,70 +246,105 @@ class SQLDecomposerAgent(LLMPlannerAgent):
         self,
         messages: list[AgentMessage],
         sender: Agent,
+        serialized_messages: list[dict[str, str]] | None = None,
     ) -> AgentMessage:
-        """Generate a reply based on the received messages."""
+        """Generate a reply based on the received messages.
+
+        If the client has a cache, identical chats (same system message and
+        history) reuse the previously generated plan instead of calling the LLM
+        again unless overwrite_cache is set. The llm_callback still fires on a
+        reused plan with the cached response. Without a client cache every chat
+        calls the LLM, e.g. to resample plans.
+
+        serialized_messages are the client chat dicts of messages if already built
+        (see MessageHistory.get_messages_with_serialized).
+        """
         if self.llm_client is not None:
+            system_message = AgentMessage(
+                agent_role=ClientMessageRole.SYSTEM,
+                content=self.system_message,
+                sending_agent=self.name,
+            )
+            # Memoizing plans is opt-in like the client's response cache
+            use_plan_cache = self.llm_client.cache is not None
+            plan_cache_key = get_plan_cache_key(system_message.content, messages)
+            if (
+                use_plan_cache
+                and not self._overwrite_cache
+                and plan_cache_key in self._plan_cache
+            ):
+                self._plan_cache.move_to_end(plan_cache_key)
+                cached_response, cached_reply, cached_plan = self._plan_cache[
+                    plan_cache_key
+                ]
+                if self._llm_callback:
+                    # Report the reused response as the client's response cache does
+                    self._llm_callback(
+                        serialize_chat_messages(
+                            messages, system_message, serialized_messages
+                        ),
+                        cached_response.model_copy(update={"cached": True}),
+                    )
+                for sub_task in cached_plan:
+                    self._plan.append(
+                        SubTask(
+                            agent=self._available_agents[sub_task.agent_name],
+                            prompt=sub_task.prompt,
+                        )
+                    )
+                return cached_reply.model_copy()
             chat_response = await generate_llm_reply(
                 client=self.llm_client,
                 messages=messages,
                 tools=[],
-                system_message=AgentMessage(
-                    agent_role=ClientMessageRole.SYSTEM,
-                    content=self.system_message,
-                    sending_agent=self.name,
-                ),
+                system_message=system_message,
                 llm_config=self._llm_config,
                 llm_callback=self._llm_callback,
                 overwrite_cache=self._overwrite_cache,
+                serialized_messages=serialized_messages,
             )
             content = chat_response.choices[0].message.content
-            print(self.system_message)
-            print(messages[-1].content)
-            print("SQL DECOMP PLANNER", content)
-            print("*****")
+            logger.debug(f"SQL decomposer plan. content={content}")
             if Commands.has_end(content):
-                return AgentMessage(
+                parsed_plan = []
+                reply = AgentMessage(
                     content=content,
                     sending_agent=self.name,
                     is_termination_message=True,
                 )
             else:
-                display_content = None
-                try:
-                    # TODO: refactor using executors
-                    parsed_plan_message = parse_plan(content, self.name)
-                    display_content = parsed_plan_message.display_content
-                    parsed_plan = [
-                        SubTaskForParse(**m)
-                        for m in json.loads(parsed_plan_message.content)
-                    ]
-                    for p in parsed_plan:
-                        print(p.prompt)
-                        print("******")
-                        print("******")
-                    # If the plan is just a single step, replace with the direct question from the user with the attributes
-                    if len(parsed_plan) == 1:
-                        parsed_plan[0].prompt = messages[-1].content
-                    for sub_task in parsed_plan:
-                        self._plan.put(
-                            SubTask(
-                                agent=self._available_agents[sub_task.agent_name],
-                                prompt=sub_task.prompt,
-                            )
+                # TODO: refactor using executors
+                parsed_plan = parse_subtasks(content)
+                # If the plan is just a single step, replace with the direct question from the user with the attributes
+                if len(parsed_plan) == 1:
+                    parsed_plan[0].prompt = messages[-1].content
+                for sub_task in parsed_plan:
+                    self._plan.append(
+                        SubTask(
+                            agent=self._available_agents[sub_task.agent_name],
+                            prompt=sub_task.prompt,
                         )
-                except Exception as e:
-                    raise e
-                return AgentMessage(
+                    )
+                reply = AgentMessage(
                     content=content,
-                    display_content=display_content,
                     sending_agent=self.name,
                 )
+            if use_plan_cache:
+                self._plan_cache[plan_cache_key] = (
+                    chat_response,
+                    reply.model_copy(),
+                    parsed_plan,
+                )
+                self._plan_cache.move_to_end(plan_cache_key)
+                if len(self._plan_cache) > MAX_PLAN_CACHE_SIZE:
+                    self._plan_cache.popitem(last=False)
+            return reply
         else:
             if len(self._available_agents) > 1:
                 raise ValueError("No LLM client provided and more than one agent.")
             agent = list(self._available_agents.values())[0]
             raw_content = messages[-1].content
-            self._plan.put(SubTask(agent=agent, prompt=raw_content))
+            self._plan.append(SubTask(agent=agent, prompt=raw_content))
             serialized_plan = f"<steps><step1><agent>{agent.name}</agent><instruction>{raw_content}</instruction></step1></steps>"
             return AgentMessage(
                 content=serialized_plan,
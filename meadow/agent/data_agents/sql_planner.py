@@ -1,7 +1,7 @@
 """SQL decomposer agent."""
 
 import logging
-from queue import Queue
+from collections import deque
 from typing import Callable
 
 from meadow.agent.agent import (
@@ -81,7 +81,7 @@ class SQLPlannerAgent(LLMAgent):
         self._description = description
         self._system_prompt = system_prompt
         self._messages = MessageHistory()
-        self._plan: Queue[SubTask] = Queue()
+        self._plan: deque[SubTask] = deque()
         self._overwrite_cache = overwrite_cache
         self._llm_callback = llm_callback
         self._silent = silent
@@ -1,5 +1,6 @@
 """Executor agent."""
 
+import asyncio
 import functools
 import json
 import logging
@@ -17,7 +18,7 @@ from meadow.agent.utils import (
     print_message,
 )
 from meadow.client.client import Client
-from meadow.client.schema import LLMConfig
+from meadow.client.schema import ChatResponse, LLMConfig
 from meadow.database.database import Database
 from meadow.database.serializer import serialize_as_list
 from meadow.history.message_history import MessageHistory
@@ -28,6 +29,9 @@ DEFAULT_BATCH_LLM_PROMPT = """You are a data analyst assistant who is going to u
 
 DEFAULT_BATCH_LLM_DESC = "Runs a model to perform a task on each row of data."
 
+# Max number of row requests in flight at once
+MAX_CONCURRENT_ROW_REQUESTS = 8
+
 
 class BatchLLMExecutor(ExecutorAgent, LLMAgentWithExecutors):
     """Agent that execute/validates a response on each row of a table.
@@ -229,30 +233,69 @@ class BatchLLMExecutor(ExecutorAgent, LLMAgentWithExecutors):
             all_rows = self.database.run_sql_to_df(
                 f"SELECT * FROM {table_to_iter.name} ORDER BY {', '.join(map(lambda x: x.name, table_to_iter.columns))}"
             )
-            all_new_col_values = []
+            system_message = AgentMessage(
+                agent_role=ClientMessageRole.SYSTEM,
+                content=self.system_message,
+                sending_agent=self.name,
+            )
+            row_messages = []
             for _, row in all_rows.iterrows():
                 parsed_response_copy = parsed_response.model_copy()
                 parsed_response_copy.content = parsed_response_copy.content.format(
                     input_val=row.to_dict()
                 )
-                messages_copy.append(parsed_response_copy)
-                chat_response = await generate_llm_reply(
-                    client=self.llm_client,
-                    messages=messages_copy,
-                    tools=[],
-                    system_message=AgentMessage(
-                        agent_role=ClientMessageRole.SYSTEM,
-                        content=self.system_message,
-                        sending_agent=self.name,
-                    ),
-                    llm_config=self._llm_config,
-                    llm_callback=self._llm_callback,
-                    overwrite_cache=self._overwrite_cache,
-                )
+                row_messages.append(parsed_response_copy)
+            # Rows are independent so their requests run concurrently. LLM calls
+            # are recorded per row so llm_callback still fires in row order.
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_ROW_REQUESTS)
+            row_llm_calls: list[tuple[list[dict[str, str]], ChatResponse] | None] = [
+                None
+            ] * len(row_messages)
+
+            def record_llm_call(
+                row_idx: int,
+                serialized_messages: list[dict[str, str]],
+                chat_response: ChatResponse,
+            ) -> None:
+                row_llm_calls[row_idx] = (serialized_messages, chat_response)
+
+            async def generate_row_value(
+                row_idx: int, row_message: AgentMessage
+            ) -> str:
+                async with semaphore:
+                    chat_response = await generate_llm_reply(
+                        client=self.llm_client,
+                        messages=[*messages_copy, row_message],
+                        tools=[],
+                        system_message=system_message,
+                        llm_config=self._llm_config,
+                        llm_callback=(
+                            functools.partial(record_llm_call, row_idx)
+                            if self._llm_callback
+                            else None
+                        ),
+                        overwrite_cache=self._overwrite_cache,
+                    )
                 content = chat_response.choices[0].message.content
-                print("Batch Executor", content)
-                all_new_col_values.append(content)
-                messages_copy.pop()
+                logger.debug(f"Batch LLM row value. row={row_idx} content={content}")
+                return content
+
+            row_tasks = [
+                asyncio.ensure_future(generate_row_value(row_idx, row_message))
+                for row_idx, row_message in enumerate(row_messages)
+            ]
+            try:
+                all_new_col_values = await asyncio.gather(*row_tasks)
+            except BaseException:
+                # Stop the other rows from making any more calls before raising
+                for task in row_tasks:
+                    task.cancel()
+                await asyncio.gather(*row_tasks, return_exceptions=True)
+                raise
+            finally:
+                for row_llm_call in row_llm_calls:
+                    if row_llm_call is not None:
+                        self._llm_callback(*row_llm_call)
             final_content = json.dumps(all_new_col_values)
             return AgentMessage(
                 content=final_content,
@@ -3,12 +3,11 @@
 import json
 import logging
 import re
+from collections import deque
+from dataclasses import asdict, dataclass
 from functools import partial
-from queue import Queue
 from typing import Callable
 
-from pydantic import BaseModel
-
 from meadow.agent.agent import (
     Agent,
     ExecutorAgent,
@@ -25,13 +24,13 @@ from meadow.agent.schema import (
     ExecutorFunctionInput,
 )
 from meadow.agent.utils import (
+    SchemaSystemPrompt,
     generate_llm_reply,
     print_message,
 )
 from meadow.client.client import Client
 from meadow.client.schema import LLMConfig
 from meadow.database.database import Database
-from meadow.database.serializer import serialize_as_list
 from meadow.history.message_history import MessageHistory
 
 logger = logging.getLogger(__name__)
@@ -63,8 +62,16 @@ Below is the data schema the user is working with.
 {serialized_schema}
 """
 
+# Use '.*' after last instruction because sometimes it'll add extra pieces we don't care about
+_STEP_RE = re.compile(
+    r"<step\d*>\s*<agent>(.*?)</agent>\s*<instruction>(.*?)</instruction>.*?</step\d*>",
+    re.DOTALL,
+)
+_USERINPUT_RE = re.compile(r"<userinput>(.*?)</userinput>", re.DOTALL)
+
 
-class SubTaskForParse(BaseModel):
+@dataclass(slots=True)
+class SubTaskForParse:
     """Sub-task in a plan used in executor."""
 
     agent_name: str
@@ -101,34 +108,23 @@ def parse_steps(input_str: str) -> list[tuple[str, str]]:
     """
     Parse the given XML-like string and extract agent, instruction pairs using regular expressions.
     """
-    # Use '.*' after last instruction because sometimes it'll add extra pieces we don't care about
-    pattern = re.compile(
-        r"<step\d*>\s*<agent>(.*?)</agent>\s*<instruction>(.*?)</instruction>.*?</step\d*>",
-        re.DOTALL,
-    )
-    matches = pattern.findall(input_str)
+    matches = _STEP_RE.findall(input_str)
     return [(agent.strip(), instruction.strip()) for agent, instruction in matches]
 
 
-def parse_plan(
+def _parse_plan(
     input: ExecutorFunctionInput,
     available_agents: dict[str, Agent],
     constraints: list[Callable[[list[SubTask], str], str | None]],
-) -> AgentMessage:
+) -> tuple[AgentMessage, list[SubTaskForParse] | None]:
     """Extract the plan from the response.
 
-    Plan follows
-    <steps>
-    <step1>
-    <agent>...</agent>
-    <instruction>...</instruction>
-    </step1>
-    ...
-    </steps>.
+    Returns the executor message and the parsed plan, or None if the plan is invalid.
+    See parse_plan.
     """
     error_message = None
     message = input.messages[-1].content
-    userinput = re.search(r"<userinput>(.*?)</userinput>", message, re.DOTALL).group(1)
+    userinput = _USERINPUT_RE.search(message).group(1)
     if message.endswith("</steps"):
         message += ">"
     if "<steps>" not in message:
@@ -136,7 +132,10 @@ def parse_plan(
     if "</steps>" not in message:
         message += "</steps>"
     if not error_message:
-        inner_steps = re.search(r"(<steps>.*</steps>)", message, re.DOTALL).group(1)
+        # Outermost <steps>...</steps> block
+        steps_start = message.find("<steps>")
+        steps_end = message.rfind("</steps>") + len("</steps>")
+        inner_steps = message[steps_start:steps_end]
         parsed_steps = parse_steps(inner_steps)
         for agent, instruction in parsed_steps:
             if agent not in available_agents:
@@ -161,23 +160,51 @@ def parse_plan(
             )
     if error_message:
         if input.can_reask_again:
-            return AgentMessage(
-                content=error_message.strip() + " Please retry.",
-                requires_response=True,
-                sending_agent=input.agent_name,
+            return (
+                AgentMessage(
+                    content=error_message.strip() + " Please retry.",
+                    requires_response=True,
+                    sending_agent=input.agent_name,
+                ),
+                None,
             )
         else:
-            return AgentMessage(
-                content=f"Current plan.\n\n{message}\n\nWe're having trouble generating a plan. Please try to rephrase.",
-                sending_agent=input.agent_name,
+            return (
+                AgentMessage(
+                    content=f"Current plan.\n\n{message}\n\nWe're having trouble generating a plan. Please try to rephrase.",
+                    sending_agent=input.agent_name,
+                ),
+                None,
             )
-    return AgentMessage(
-        content=json.dumps([m.model_dump() for m in parsed_plan]),
-        display_content=inner_steps,
-        sending_agent=input.agent_name,
+    return (
+        AgentMessage(
+            content=json.dumps([asdict(m) for m in parsed_plan]),
+            display_content=inner_steps,
+            sending_agent=input.agent_name,
+        ),
+        parsed_plan,
     )
 
 
+def parse_plan(
+    input: ExecutorFunctionInput,
+    available_agents: dict[str, Agent],
+    constraints: list[Callable[[list[SubTask], str], str | None]],
+) -> AgentMessage:
+    """Extract the plan from the response.
+
+    Plan follows
+    <steps>
+    <step1>
+    <agent>...</agent>
+    <instruction>...</instruction>
+    </step1>
+    ...
+    </steps>.
+    """
+    return _parse_plan(input, available_agents, constraints)[0]
+
+
 class PlannerAgent(LLMPlannerAgent, LLMAgentWithExecutors):
     """Agent that generates a plan for a task."""
 
@@ -208,10 +235,21 @@ class PlannerAgent(LLMPlannerAgent, LLMAgentWithExecutors):
         self._system_prompt = system_prompt
         self._messages = MessageHistory()
         self._role = AgentRole.TASK_HANDLER
-        self._plan: Queue[SubTask] = Queue()
+        self._plan: deque[SubTask] = deque()
         self._overwrite_cache = overwrite_cache
         self._llm_callback = llm_callback
         self._silent = silent
+        # Available agents are fixed for the lifetime of the planner
+        self._schema_system_prompt = SchemaSystemPrompt(
+            self._system_prompt,
+            termination_message=Commands.END,
+            agents="\n".join(
+                [
+                    f"<agent>\n{a.name}: {a.description}\n</agent>"
+                    for a in self._available_agents.values()
+                ]
+            ),
+        )
 
         if self._executors is None:
             self._executors = [
@@ -250,20 +288,7 @@ class PlannerAgent(LLMPlannerAgent, LLMAgentWithExecutors):
     @property
     def system_message(self) -> str:
         """Get the system message."""
-        if self._database is not None:
-            serialized_schema = serialize_as_list(self._database.tables)
-        else:
-            serialized_schema = ""
-        return self._system_prompt.format(
-            serialized_schema=serialized_schema,
-            termination_message=Commands.END,
-            agents="\n".join(
-                [
-                    f"<agent>\n{a.name}: {a.description}\n</agent>"
-                    for a in self._available_agents.values()
-                ]
-            ),
-        )
+        return self._schema_system_prompt.format(self._database)
 
     def set_chat_role(self, role: AgentRole) -> None:
         """Set the chat role of the agent."""
@@ -288,9 +313,9 @@ class PlannerAgent(LLMPlannerAgent, LLMAgentWithExecutors):
         self,
     ) -> SubTask:
         """Move to the next agent in the task plan."""
-        if self._plan.empty():
+        if not self._plan:
             return None
-        subtask = self._plan.get()
+        subtask = self._plan.popleft()
         # When moving on, reset executors to allow for new attempts
         if subtask.agent.executors:
             for ex in subtask.agent.executors:
@@ -340,8 +365,11 @@ class PlannerAgent(LLMPlannerAgent, LLMAgentWithExecutors):
             agent=sender, agent_role=ClientMessageRole.RECEIVER, message=message
         )
 
+        messages, serialized_messages = self._messages.get_messages_with_serialized(
+            sender
+        )
         reply = await self.generate_reply(
-            messages=self._messages.get_messages(sender), sender=sender
+            messages=messages, sender=sender, serialized_messages=serialized_messages
         )
         await self.send(reply, sender)
 
@@ -349,8 +377,13 @@ class PlannerAgent(LLMPlannerAgent, LLMAgentWithExecutors):
         self,
         messages: list[AgentMessage],
         sender: Agent,
+        serialized_messages: list[dict[str, str]] | None = None,
     ) -> AgentMessage:
-        """Generate a reply based on the received messages."""
+        """Generate a reply based on the received messages.
+
+        serialized_messages are the client chat dicts of messages if already built
+        (see MessageHistory.get_messages_with_serialized).
+        """
         if self.llm_client is not None:
             chat_response = await generate_llm_reply(
                 client=self.llm_client,
@@ -364,6 +397,7 @@ class PlannerAgent(LLMPlannerAgent, LLMAgentWithExecutors):
                 llm_config=self._llm_config,
                 llm_callback=self._llm_callback,
                 overwrite_cache=self._overwrite_cache,
+                serialized_messages=serialized_messages,
             )
             content = chat_response.choices[0].message.content
             # Add back user input for use in the plan parsing constraints
@@ -376,12 +410,12 @@ class PlannerAgent(LLMPlannerAgent, LLMAgentWithExecutors):
                     is_termination_message=True,
                 )
             else:
-                self._plan = Queue()
+                self._plan = deque()
                 # parse_plan will check and rethrow any errors in the executor phase. However, we
                 # need to update the planner state with the output of the parse_plan function.
                 # So we call it here as well. If there's an error, that's okay, but planner
                 # agent will get recalled by the validator to fix it.
-                parsed_plan_message = parse_plan(
+                _, parsed_plan = _parse_plan(
                     input=ExecutorFunctionInput(
                         messages=[
                             AgentMessage(
@@ -396,20 +430,13 @@ class PlannerAgent(LLMPlannerAgent, LLMAgentWithExecutors):
                     available_agents=self.available_agents,
                     constraints=self.plan_constraints,
                 )
-                try:
-                    parsed_plan = [
-                        SubTaskForParse(**m)
-                        for m in json.loads(parsed_plan_message.content)
-                    ]
-                    for sub_task in parsed_plan:
-                        self._plan.put(
-                            SubTask(
-                                agent=self._available_agents[sub_task.agent_name],
-                                prompt=sub_task.prompt,
-                            )
+                for sub_task in parsed_plan or []:
+                    self._plan.append(
+                        SubTask(
+                            agent=self._available_agents[sub_task.agent_name],
+                            prompt=sub_task.prompt,
                         )
-                except Exception:
-                    pass
+                    )
                 return AgentMessage(
                     content=content,
                     sending_agent=self.name,
@@ -424,7 +451,7 @@ class PlannerAgent(LLMPlannerAgent, LLMAgentWithExecutors):
                 .content.replace("<objective>", "")
                 .replace("</objective>", "")
             )
-            self._plan.put(SubTask(agent=agent, prompt=raw_content))
+            self._plan.append(SubTask(agent=agent, prompt=raw_content))
             serialized_plan = f"<steps><step1><agent>{agent.name}</agent><instruction>{raw_content}</instruction></step1></steps>"
             return AgentMessage(
                 content=serialized_plan,
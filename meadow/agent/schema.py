@@ -21,7 +21,9 @@ class Commands:
     @staticmethod
     def _has_signal_string(content: str, signal_str: str) -> bool:
         """Check if the message contains signalling string."""
-        return content.strip().endswith(signal_str) or content.strip().startswith(
+        # Only strip the side being checked. rstrip/lstrip return the string
+        # itself when there is no whitespace, avoiding a copy of long messages.
+        return content.rstrip().endswith(signal_str) or content.lstrip().startswith(
             signal_str
         )
 
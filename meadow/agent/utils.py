@@ -6,9 +6,17 @@ from termcolor import colored
 from meadow.agent.schema import AgentMessage
 from meadow.client.client import Client
 from meadow.client.schema import ChatResponse, LLMConfig, ToolSpec
+from meadow.database.database import Database
+from meadow.database.serializer import serialize_as_list
 
 lgger = logging.getLogger(__name__)
 
+# Shared default so calls without a config don't each build one
+_DEFAULT_LLM_CONFIG = LLMConfig()
+
+# Stand-in for the schema when pre-formatting system prompts
+_SCHEMA_PLACEHOLDER = "\0"
+
 COLOR_MAP = {
     "User": "yellow",
     "Controller": "light_blue",
@@ -35,9 +43,8 @@ def print_message(message: AgentMessage, from_agent: str, to_agent: str) -> None
         content = message.display_content
     else:
         content = message.content
-    if from_agent in COLOR_MAP:
-        color = COLOR_MAP[from_agent]
-    else:
+    color = COLOR_MAP.get(from_agent)
+    if color is None:
         # Add a default color
         color = AVAILABLE_COLORS.pop(0)
         COLOR_MAP[from_agent] = color
@@ -45,26 +52,87 @@ def print_message(message: AgentMessage, from_agent: str, to_agent: str) -> None
     print(colored(to_print, color))  # type: ignore
 
 
+class SchemaSystemPrompt:
+    """A system prompt template with the database schema filled in.
+
+    The template is formatted once with every field but serialized_schema and
+    split around the schema. The message is only rebuilt, by joining in the
+    serialized schema, when the database schema changes.
+    """
+
+    def __init__(self, system_prompt: str, **format_kwargs: str) -> None:
+        """Initialize the prompt with the fields other than serialized_schema."""
+        self._prompt_parts = system_prompt.format(
+            serialized_schema=_SCHEMA_PLACEHOLDER, **format_kwargs
+        ).split(_SCHEMA_PLACEHOLDER)
+        self._message: str | None = None
+        self._schema_version: int | None = None
+
+    def format(self, database: Database | None) -> str:
+        """Get the system prompt for the current schema of the database.
+
+        An empty schema is used if there is no database.
+        """
+        schema_version = database.schema_version if database is not None else None
+        if self._message is None or self._schema_version != schema_version:
+            if database is not None:
+                serialized_schema = serialize_as_list(database.tables)
+            else:
+                serialized_schema = ""
+            self._message = serialized_schema.join(self._prompt_parts)
+            self._schema_version = schema_version
+        return self._message
+
+
+def serialize_chat_messages(
+    messages: list[AgentMessage],
+    system_message: AgentMessage,
+    serialized_messages: list[dict[str, str]] | None = None,
+) -> list[dict[str, str]]:
+    """Get the client chat dicts of the system message followed by messages.
+
+    If serialized_messages is given, it must be the role and content dicts of
+    messages (e.g. from MessageHistory.get_messages_with_serialized) and is
+    used instead of serializing messages again.
+    """
+    # Make sure the chat role is updated wrt to the agent role
+    # This should technically be handled in the agents, but if someone
+    # forgets to update the role from the agent_role, we do it here
+    system_message.role = system_message.agent_role.value
+    if serialized_messages is None:
+        for message in messages:
+            message.role = message.agent_role.value
+        # Now dump to dict to pass to client. The dicts are built directly as
+        # model_dump is slow over long histories. Keep model_dump's key order
+        # so cache keys stay the same.
+        serialized_messages = [{"content": m.content, "role": m.role} for m in messages]
+    return [
+        {"content": system_message.content, "role": system_message.role},
+        *serialized_messages,
+    ]
+
+
 async def generate_llm_reply(
     client: Client,
     messages: list[AgentMessage],
     tools: list[ToolSpec],
     system_message: AgentMessage,
     model: str = None,
-    llm_config: LLMConfig = LLMConfig(),
+    llm_config: LLMConfig | None = None,
     llm_callback: Callable = None,
     overwrite_cache: bool = False,
+    serialized_messages: list[dict[str, str]] | None = None,
 ) -> ChatResponse:
-    """Generate a reply using client chat method."""
-    # Make sure the chat role is updated wrt to the agent role
-    # This should technically be handled in the agents, but if someone
-    # forgets to update the role from the agent_role, we do it here
-    system_message.role = system_message.agent_role.value
-    for message in messages:
-        message.role = message.agent_role.value
-    # Now dump to dict to pass to client
-    serialized_messages = [system_message.model_dump(include={"role", "content"})]
-    serialized_messages += [m.model_dump(include={"role", "content"}) for m in messages]
+    """Generate a reply using client chat method.
+
+    If llm_config is None, the default LLMConfig is used.
+
+    See serialize_chat_messages for serialized_messages.
+    """
+    llm_config = llm_config or _DEFAULT_LLM_CONFIG
+    serialized_messages = serialize_chat_messages(
+        messages, system_message, serialized_messages
+    )
     chat_response = await client.chat(
         messages=serialized_messages,
         tools=tools if tools else None,
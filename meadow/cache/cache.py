@@ -7,13 +7,16 @@ from meadow.client.schema import ChatRequest, ChatResponse
 
 
 def serialize_request(request: ChatRequest) -> str:
-    """Serialize a request."""
+    """Serialize a request.
+
+    This is the cache key so the format must stay stable.
+    """
     return json.dumps(request.model_dump(exclude_none=True))
 
 
 def serialize_response(response: ChatResponse) -> str:
     """Serialize a response."""
-    return json.dumps(response.model_dump())
+    return response.model_dump_json()
 
 
 class Cache(ABC):
@@ -80,7 +83,7 @@ class Cache(ABC):
         key = serialize_request(request)
         cached_response = self.get_key(key)
         if cached_response:
-            response = ChatResponse.model_validate(json.loads(cached_response))
+            response = ChatResponse.model_validate_json(cached_response)
             response.cached = True
             return response
         return None
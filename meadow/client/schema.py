@@ -1,12 +1,16 @@
 """Language model request object."""
 
 import json
+import re
+from functools import cached_property, lru_cache
 from typing import Any, Literal
 
 from pydantic import BaseModel, model_serializer
 
 Role = Literal["assistant", "user", "system"]
 
+_ARRAY_TYPE_RE = re.compile(r"array\[([^\]]+)\]")
+
 
 class FunctionArgSpec(BaseModel):
     """A function argument spec."""
@@ -27,34 +31,67 @@ class ToolSpec(BaseModel):
     description: str
     function_args: list[FunctionArgSpec]
 
-    @model_serializer
     def serialize_for_llm(self) -> dict[str, Any]:
         """Construct the message for LLM."""
-        tool_dict: dict[str, Any] = {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": {},
-                    "required": [],
+        return self.model_dump()
+
+    @model_serializer
+    def _serialize(self) -> dict[str, Any]:
+        """Serialize with the cached tool dict.
+
+        pydantic copies the returned dict so callers never get the shared one.
+        """
+        return _serialize_tool(
+            self.name,
+            self.description,
+            tuple(
+                (arg.name, arg.description, arg.type, arg.required)
+                for arg in self.function_args
+            ),
+        )
+
+
+@lru_cache(maxsize=128)
+def _serialize_tool(
+    name: str,
+    description: str,
+    function_args: tuple[tuple[str, str, str, bool], ...],
+) -> dict[str, Any]:
+    """Build the LLM tool dict.
+
+    Cached on the spec contents as agents send the same tools on every call.
+    The result is shared so must only be returned through ToolSpec._serialize.
+    """
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    arg_name: {
+                        "description": arg_description,
+                        **_arg_type_dict(arg_type),
+                    }
+                    for arg_name, arg_description, arg_type, _ in function_args
                 },
+                "required": [
+                    arg_name
+                    for arg_name, *_, arg_required in function_args
+                    if arg_required
+                ],
             },
-        }
-        for arg in self.function_args:
-            if arg.type.startswith("array"):
-                subtype = arg.type.split("[")[1].split("]")[0]
-                type_abj = {"type": "array", "items": {"type": subtype}}
-            else:
-                type_abj = {"type": arg.type}
-            tool_dict["function"]["parameters"]["properties"][arg.name] = {
-                "description": arg.description,
-                **type_abj,
-            }
-            if arg.required:
-                tool_dict["function"]["parameters"]["required"].append(arg.name)
-        return tool_dict
+        },
+    }
+
+
+def _arg_type_dict(arg_type: str) -> dict[str, Any]:
+    """Get the JSON schema type of a function argument."""
+    array_match = _ARRAY_TYPE_RE.match(arg_type)
+    if array_match:
+        return {"type": "array", "items": {"type": array_match.group(1)}}
+    return {"type": arg_type}
 
 
 class ToolCall(BaseModel):
@@ -69,9 +106,32 @@ class ToolCall(BaseModel):
     """The name of the function to call."""
     name: str
 
-    @property
+    class Config:
+        """Pydantic configuration."""
+
+        # arguments is parsed once from unparsed_arguments so it must not change
+        frozen = True
+
+    def model_copy(
+        self, *, update: dict[str, Any] | None = None, deep: bool = False
+    ) -> "ToolCall":
+        """Copy the tool call.
+
+        The copy parses its own arguments so it never shares or keeps stale ones.
+        """
+        copied = super().model_copy(update=update, deep=deep)
+        copied.__dict__.pop("arguments", None)
+        return copied
+
+    @cached_property
     def arguments(self) -> dict[str, Any]:
-        """The arguments to call the function with."""
+        """The arguments to call the function with.
+
+        Parsed once on first access.
+        """
+        # No-argument calls often come back blank, which would only raise
+        if not self.unparsed_arguments or self.unparsed_arguments.isspace():
+            return {}
         try:
             return json.loads(self.unparsed_arguments)
         except json.JSONDecodeError:
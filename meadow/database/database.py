@@ -214,10 +214,22 @@ class Database:
 
         self._view_tables: dict[str, Table] = {}
 
+        # Bumped on every change to the visible schema so callers can cache
+        # anything derived from the tables (e.g. serialized prompts).
+        self._schema_version = 0
+
     def close(self) -> None:
         """Close the connection to the database."""
         self._connector.close()
 
+    @property
+    def schema_version(self) -> int:
+        """Get the version of the schema.
+
+        Changes whenever a table is added, removed, hidden, or otherwise updated.
+        """
+        return self._schema_version
+
     @property
     def tables(self) -> list[Table]:
         """Get the tables in the database."""
@@ -270,6 +282,7 @@ class Database:
         for _, table in self._view_tables.items():
             if table.is_draft:
                 table.is_draft = False
+        self._schema_version += 1
 
     def deprecate_table(self, name: str) -> None:
         """Deprecate a table."""
@@ -277,6 +290,7 @@ class Database:
             self._base_tables[name].is_deprecated = True
         if name in self._view_tables:
             self._view_tables[name].is_deprecated = True
+        self._schema_version += 1
 
     def unhide_all_tables(self) -> None:
         """Unhide all tables."""
@@ -284,6 +298,7 @@ class Database:
             table.is_hidden = False
         for _, table in self._view_tables.items():
             table.is_hidden = False
+        self._schema_version += 1
 
     def hide_table(self, name: str) -> None:
         """Hide a table."""
@@ -291,6 +306,7 @@ class Database:
             self._base_tables[name].is_hidden = True
         if name in self._view_tables:
             self._view_tables[name].is_hidden = True
+        self._schema_version += 1
 
     def hide_all_but(self, name: str) -> None:
         """Hide all tables except the one specified."""
@@ -300,6 +316,7 @@ class Database:
         for k in self._view_tables:
             if k != name:
                 self._view_tables[k].is_hidden = True
+        self._schema_version += 1
 
     def run_sql_to_df(self, sql: str) -> pd.DataFrame:
         """Run an SQL query."""
@@ -381,6 +398,7 @@ class Database:
             data=df.head(5).to_dict(orient="records") if df is not None else None,
             view_sql=sql,
         )
+        self._schema_version += 1
 
     def add_base_table_column_remap(
         self, name: str, column_remap: dict[str, str]
@@ -405,6 +423,7 @@ class Database:
             new_table.data[i] = {column_remap.get(k, k): v for k, v in row.items()}
         self._base_table_remapping[name] = new_table
         self._base_tables[name].is_deprecated = True
+        self._schema_version += 1
         return
 
     def remove_base_table_remaps(self) -> None:
@@ -412,11 +431,13 @@ class Database:
         self._base_table_remapping = {}
         for name in self._base_tables:
             self._base_tables[name].is_deprecated = False
+        self._schema_version += 1
 
     def remove_view(self, name: str) -> None:
         """Remove a view from the database."""
         if name in self._view_tables:
             del self._view_tables[name]
+            self._schema_version += 1
 
     def get_number_of_views(self) -> int:
         """Return the number of views in the database."""
@@ -17,6 +17,24 @@ def is_time_unique(
     return True
 
 
+def get_termination_pair_indices(history: list[AgentMessage]) -> set[int]:
+    """Get the indices of user-assistant pairs that end in a termination message."""
+    # iterate over user-assistant pairs and remove the user response that trigger termination and the termination message
+    history_to_drop: set[int] = set()
+    last_msg_idx = 0
+    last_msg = history[0]
+    for msg in history[1:]:
+        if (
+            last_msg.agent_role == ClientMessageRole.RECEIVER
+            and msg.agent_role == ClientMessageRole.SENDER
+            and msg.is_termination_message
+        ):
+            history_to_drop.update([last_msg_idx, last_msg_idx + 1])
+        last_msg_idx += 1
+        last_msg = msg
+    return history_to_drop
+
+
 class MessageHistory:
     """Class for managing message history between different agents.
 
@@ -27,6 +45,8 @@ class MessageHistory:
     def __init__(self) -> None:
         """Initialize the message history."""
         self._history: dict[Agent, list[AgentMessage]] = {}
+        # Role and content of each message in _history as sent to the LLM
+        self._serialized_history: dict[Agent, list[dict[str, str]]] = {}
 
     def add_message(
         self, agent: Agent, agent_role: ClientMessageRole, message: AgentMessage
@@ -34,6 +54,7 @@ class MessageHistory:
         """Add a message to the message history."""
         if agent not in self._history:
             self._history[agent] = []
+            self._serialized_history[agent] = []
         # make a copy of the message to avoid modifying the original
         message = message.model_copy()
         if agent_role == ClientMessageRole.SENDER:
@@ -45,6 +66,9 @@ class MessageHistory:
         message.creation_time = time.time()
         assert is_time_unique(self._history, message.creation_time)
         self._history[agent].append(message)
+        self._serialized_history[agent].append(
+            {"content": message.content, "role": message.role}
+        )
 
     def copy_messages_from(self, agent: Agent, messages: list[AgentMessage]) -> None:
         """Copy a list of messages to another agent."""
@@ -64,24 +88,38 @@ class MessageHistory:
             return []
         history = self._history[recipient]
         if skip_termination_pairs and len(history) > 1:
-            # iterate over user-assistant pairs and remove the user response that trigger termination and the termination message
-            history_to_drop = []
-            last_msg_idx = 0
-            last_msg = history[0]
-            for msg in history[1:]:
-                if (
-                    last_msg.agent_role == ClientMessageRole.RECEIVER
-                    and msg.agent_role == ClientMessageRole.SENDER
-                    and msg.is_termination_message
-                ):
-                    history_to_drop.extend([last_msg_idx, last_msg_idx + 1])
-                last_msg_idx += 1
-                last_msg = msg
+            history_to_drop = get_termination_pair_indices(history)
             history = [
                 msg for idx, msg in enumerate(history) if idx not in history_to_drop
             ]
         return history
 
+    def get_messages_with_serialized(
+        self, recipient: Agent, skip_termination_pairs: bool = True
+    ) -> tuple[list[AgentMessage], list[dict[str, str]]]:
+        """Get all messages between two agents and their client chat dicts.
+
+        The messages match get_messages. The dicts are the role and content of
+        each of those messages, built once when the message is added, and must
+        not be modified.
+        """
+        if recipient not in self._history:
+            return [], []
+        history = self._history[recipient]
+        serialized_history = self._serialized_history[recipient]
+        if skip_termination_pairs and len(history) > 1:
+            history_to_drop = get_termination_pair_indices(history)
+            if history_to_drop:
+                history = [
+                    msg for idx, msg in enumerate(history) if idx not in history_to_drop
+                ]
+                serialized_history = [
+                    msg
+                    for idx, msg in enumerate(serialized_history)
+                    if idx not in history_to_drop
+                ]
+        return history, serialized_history
+
     def get_all_messages(self) -> dict[Agent, list[AgentMessage]]:
         """Get all messages in the history."""
         to_return = {}
@@ -0,0 +1,222 @@
+from unittest.mock import AsyncMock, MagicMock, Mock
+
+import pytest
+
+from meadow.agent.agent import Agent
+from meadow.agent.data_agents import sql_decomposer
+from meadow.agent.data_agents.sql_decomposer import (
+    SQLDecomposerAgent,
+    parse_steps_numbers,
+)
+from meadow.agent.schema import AgentMessage, ClientMessageRole
+from meadow.cache.cache import Cache
+from meadow.client.client import Client
+from meadow.client.schema import ChatMessage, ChatResponse, Choice
+from meadow.database.connector.duckdb import DuckDBConnector
+from meadow.database.database import Database
+
+
+def make_chat_response(content: str) -> ChatResponse:
+    """Make a chat response with a single choice."""
+    return ChatResponse(
+        id="chatcmpl-1",
+        cached=False,
+        choices=[
+            Choice(
+                index=0,
+                message=ChatMessage(content=content, role="assistant"),
+            )
+        ],
+        created=1713994870,
+        model="gpt-3.5-turbo-0125",
+    )
+
+
+@pytest.fixture
+def client() -> MagicMock:
+    """Client with a mocked chat."""
+    client = MagicMock(spec=Client)
+    client.cache = None
+    client.chat = AsyncMock()
+    client.chat.return_value = make_chat_response(
+        "1. Find the users.\n2. Count them from `sql1`."
+    )
+    return client
+
+
+@pytest.fixture
+def cached_client(client: MagicMock) -> MagicMock:
+    """Client with a mocked chat and a response cache."""
+    client.cache = MagicMock(spec=Cache)
+    return client
+
+
+def make_question(content: str) -> AgentMessage:
+    """Make a user question to the decomposer."""
+    return AgentMessage(
+        content=content,
+        agent_role=ClientMessageRole.RECEIVER,
+        sending_agent="User",
+    )
+
+
+@pytest.fixture
+def user() -> Agent:
+    """User agent chatting with the decomposer."""
+    user = Mock(spec=Agent)
+    user.name = "User"
+    return user
+
+
+def test_parse_steps_numbers() -> None:
+    """Test parsing enumerated steps."""
+    input_str = """Here is the plan.
+
+1. Find the users over 50.
+2. Count the **users** from `sql1`
+   per country.
+3. Take the top two countries.
+The final attributes should be country."""
+    assert parse_steps_numbers(input_str) == [
+        "Find the users over 50.",
+        "Count the users from `sql1`\n   per country.",
+        "Take the top two countries.\nThe final attributes should be country.",
+    ]
+
+    # Steps are ordered by number and a step body can start with a number
+    input_str = "1. First step.\n3. 2019. Third step.\n2. Second step."
+    assert parse_steps_numbers(input_str) == [
+        "First step.",
+        "Second step.",
+        "2019. Third step.",
+    ]
+
+    with pytest.raises(ValueError):
+        parse_steps_numbers("No steps here.")
+
+
+@pytest.mark.asyncio
+async def test_generate_reply_uses_given_messages(
+    client: MagicMock, user: Agent, duckdb_connector: DuckDBConnector
+) -> None:
+    """Test the LLM is sent the given messages, not the stored history."""
+    decomposer = SQLDecomposerAgent(  # type: ignore[abstract]
+        client=client, llm_config=None, database=Database(duckdb_connector)
+    )
+    decomposer.add_to_messages(
+        user,
+        [
+            make_question("old question"),
+        ],
+    )
+    await decomposer.generate_reply(
+        [make_question("new question")],
+        user,
+    )
+    assert client.chat.call_args.kwargs["messages"][1:] == [
+        {"content": "new question", "role": "user"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_generate_reply_plan_cache(
+    cached_client: MagicMock, user: Agent, duckdb_connector: DuckDBConnector
+) -> None:
+    """Test identical chats reuse the plan without calling the LLM."""
+    llm_callback = Mock()
+    decomposer = SQLDecomposerAgent(  # type: ignore[abstract]
+        client=cached_client,
+        llm_config=None,
+        database=Database(duckdb_connector),
+        llm_callback=llm_callback,
+    )
+    reply = await decomposer.generate_reply([make_question("How many users?")], user)
+    cached_reply = await decomposer.generate_reply(
+        [make_question("How many users?")], user
+    )
+    assert cached_client.chat.call_count == 1
+    assert cached_reply == reply
+    assert cached_reply is not reply
+    # The sub-tasks are queued again for the cached plan
+    prompts = []
+    while (sub_task := decomposer.move_to_next_agent()) is not None:
+        prompts.append(sub_task.prompt)
+    assert prompts == ["Find the users.", "Count them from `sql1`."] * 2
+    # The callback fires on the hit with the same messages and a cached response
+    assert llm_callback.call_count == 2
+    (messages, response), (cached_messages, cached_response) = (
+        call.args for call in llm_callback.call_args_list
+    )
+    assert cached_messages == messages
+    assert not response.cached
+    assert cached_response.cached
+    assert cached_response.choices == response.choices
+
+    # A different chat is not a hit
+    await decomposer.generate_reply([make_question("How many emails?")], user)
+    assert cached_client.chat.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_generate_reply_plan_cache_single_step(
+    cached_client: MagicMock, user: Agent, duckdb_connector: DuckDBConnector
+) -> None:
+    """Test a cached single step plan keeps the user question as the prompt."""
+    cached_client.chat.return_value = make_chat_response("1. Count the users.")
+    decomposer = SQLDecomposerAgent(  # type: ignore[abstract]
+        client=cached_client, llm_config=None, database=Database(duckdb_connector)
+    )
+    for _ in range(2):
+        await decomposer.generate_reply([make_question("How many users?")], user)
+        assert decomposer.move_to_next_agent().prompt == "How many users?"
+        assert decomposer.move_to_next_agent() is None
+    assert cached_client.chat.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_reply_plan_cache_overwrite(
+    cached_client: MagicMock, user: Agent, duckdb_connector: DuckDBConnector
+) -> None:
+    """Test overwrite_cache bypasses the plan cache."""
+    decomposer = SQLDecomposerAgent(  # type: ignore[abstract]
+        client=cached_client,
+        llm_config=None,
+        database=Database(duckdb_connector),
+        overwrite_cache=True,
+    )
+    for _ in range(2):
+        await decomposer.generate_reply([make_question("How many users?")], user)
+    assert cached_client.chat.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_generate_reply_plan_cache_size(
+    cached_client: MagicMock,
+    user: Agent,
+    duckdb_connector: DuckDBConnector,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test the plan cache drops the least recently used plan when full."""
+    monkeypatch.setattr(sql_decomposer, "MAX_PLAN_CACHE_SIZE", 2)
+    decomposer = SQLDecomposerAgent(  # type: ignore[abstract]
+        client=cached_client, llm_config=None, database=Database(duckdb_connector)
+    )
+    for question in ["one?", "two?", "one?", "three?", "one?"]:
+        await decomposer.generate_reply([make_question(question)], user)
+    # "two?" was dropped for "three?" as "one?" was used more recently
+    assert cached_client.chat.call_count == 3
+    await decomposer.generate_reply([make_question("two?")], user)
+    assert cached_client.chat.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_generate_reply_without_client_cache(
+    client: MagicMock, user: Agent, duckdb_connector: DuckDBConnector
+) -> None:
+    """Test plans are not reused when the client does not cache responses."""
+    decomposer = SQLDecomposerAgent(  # type: ignore[abstract]
+        client=client, llm_config=None, database=Database(duckdb_connector)
+    )
+    for _ in range(2):
+        await decomposer.generate_reply([make_question("How many users?")], user)
+    assert client.chat.call_count == 2
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import tempfile
+from typing import Any, Generator
+from unittest.mock import MagicMock, Mock
+
+import duckdb
+import pytest
+
+from meadow.agent.agent import Agent
+from meadow.agent.executor.batch_llm import (
+    MAX_CONCURRENT_ROW_REQUESTS,
+    BatchLLMExecutor,
+)
+from meadow.agent.schema import AgentMessage, ClientMessageRole, ExecutorFunctionInput
+from meadow.client.client import Client
+from meadow.client.schema import ChatMessage, ChatResponse, Choice
+from meadow.database.connector.duckdb import DuckDBConnector
+from meadow.database.database import Database
+
+NUM_ROWS = 20
+
+# Delay per remaining row so later rows finish first
+ROW_DELAY = 0.005
+
+
+class FakeChat:
+    """Chat that echoes the row prompt and tracks the calls in flight."""
+
+    def __init__(self, fail_row: int | None = None) -> None:
+        self.fail_row = fail_row
+        self.started = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(
+        self, messages: list[dict[str, str]], **kwargs: Any
+    ) -> ChatResponse:
+        row_prompt = messages[-1]["content"]
+        row_idx = int(row_prompt.split("'id': ")[1].split("}")[0])
+        self.started += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if row_idx == self.fail_row:
+                # Fail once a few of the first rows have finished
+                await asyncio.sleep(ROW_DELAY * (NUM_ROWS - 4.5))
+                raise RuntimeError("Rate limited")
+            await asyncio.sleep(ROW_DELAY * (NUM_ROWS - row_idx))
+        finally:
+            self.in_flight -= 1
+        return ChatResponse(
+            id="chatcmpl-1",
+            cached=False,
+            choices=[
+                Choice(
+                    index=0,
+                    message=ChatMessage(content=row_prompt, role="assistant"),
+                )
+            ],
+            created=1713994870,
+            model="gpt-3.5-turbo-0125",
+        )
+
+
+@pytest.fixture
+def database() -> Generator[Database, None, None]:
+    """Database with a single table of NUM_ROWS rows."""
+    file_name = tempfile.mktemp()
+    conn = duckdb.connect(file_name)
+    conn.execute("CREATE TABLE numbers (id INTEGER);")
+    conn.execute(f"INSERT INTO numbers SELECT range FROM range({NUM_ROWS});")
+    conn.close()
+    yield Database(DuckDBConnector(file_name))
+    os.remove(file_name)
+
+
+def row_prompt(input: ExecutorFunctionInput) -> AgentMessage:
+    """Execution function asking for a value per row."""
+    return AgentMessage(
+        content="Row {input_val}",
+        sending_agent="BatchLLMExecutor",
+        requires_response=True,
+    )
+
+
+def make_executor(
+    chat: FakeChat, database: Database, llm_callback: Mock | None = None
+) -> BatchLLMExecutor:
+    """Make a batch executor using the fake chat."""
+    client = MagicMock(spec=Client)
+    client.chat = chat
+    return BatchLLMExecutor(
+        client=client,
+        llm_config=None,
+        database=database,
+        execution_func=row_prompt,
+        llm_callback=llm_callback,
+    )
+
+
+def make_request() -> list[AgentMessage]:
+    """Make the messages sent to the executor."""
+    return [
+        AgentMessage(
+            content="Add a column",
+            agent_role=ClientMessageRole.SENDER,
+            sending_agent="User",
+        )
+    ]
+
+
+@pytest.mark.asyncio
+async def test_generate_reply_rows(database: Database) -> None:
+    """Test rows run concurrently but keep row order."""
+    chat = FakeChat()
+    llm_callback = Mock()
+    executor = make_executor(chat, database, llm_callback)
+    reply = await executor.generate_reply(make_request(), Mock(spec=Agent))
+    expected = [f"Row {{'id': {i}}}" for i in range(NUM_ROWS)]
+    assert json.loads(reply.content) == expected
+    assert chat.max_in_flight == MAX_CONCURRENT_ROW_REQUESTS
+    # The callback fires once per row in row order
+    assert [
+        call.args[1].choices[0].message.content for call in llm_callback.call_args_list
+    ] == expected
+    assert [
+        call.args[0][-1]["content"] for call in llm_callback.call_args_list
+    ] == expected
+
+
+@pytest.mark.asyncio
+async def test_generate_reply_row_error(database: Database) -> None:
+    """Test a failing row cancels the remaining rows."""
+    chat = FakeChat(fail_row=0)
+    llm_callback = Mock()
+    executor = make_executor(chat, database, llm_callback)
+    with pytest.raises(RuntimeError):
+        await executor.generate_reply(make_request(), Mock(spec=Agent))
+    assert chat.in_flight == 0
+    assert chat.started < NUM_ROWS
+    # Rows that finished before the failure are still reported
+    assert 0 < llm_callback.call_count < NUM_ROWS
+    await asyncio.sleep(ROW_DELAY * NUM_ROWS)
+    assert chat.started < NUM_ROWS
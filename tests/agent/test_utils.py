@@ -0,0 +1,38 @@
+from meadow.agent.data_agents.sql_decomposer import DEFAULT_SQL_PROMPT
+from meadow.agent.planner import DEFAULT_PLANNER_PROMPT
+from meadow.agent.schema import Commands
+from meadow.agent.utils import SchemaSystemPrompt
+from meadow.database.connector.duckdb import DuckDBConnector
+from meadow.database.database import Database
+from meadow.database.serializer import serialize_as_list
+
+
+def test_schema_system_prompt(duckdb_connector: DuckDBConnector) -> None:
+    """Test the schema system prompt matches formatting the template."""
+    database = Database(duckdb_connector)
+
+    schema_prompt = SchemaSystemPrompt(DEFAULT_SQL_PROMPT)
+    assert schema_prompt.format(database) == DEFAULT_SQL_PROMPT.format(
+        serialized_schema=serialize_as_list(database.tables)
+    )
+
+    format_kwargs = {
+        "termination_message": Commands.END,
+        "agents": "<agent>\nSQLGenerator: Writes SQL with {braces}\n</agent>",
+    }
+    schema_prompt = SchemaSystemPrompt(DEFAULT_PLANNER_PROMPT, **format_kwargs)
+    assert schema_prompt.format(database) == DEFAULT_PLANNER_PROMPT.format(
+        serialized_schema=serialize_as_list(database.tables), **format_kwargs
+    )
+    assert schema_prompt.format(None) == DEFAULT_PLANNER_PROMPT.format(
+        serialized_schema="", **format_kwargs
+    )
+
+    # The prompt is rebuilt when the schema changes
+    message = schema_prompt.format(database)
+    assert schema_prompt.format(database) is message
+    database.hide_table("emails")
+    assert schema_prompt.format(database) == DEFAULT_PLANNER_PROMPT.format(
+        serialized_schema=serialize_as_list(database.tables), **format_kwargs
+    )
+    assert "emails" not in schema_prompt.format(database)
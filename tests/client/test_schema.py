@@ -1,3 +1,6 @@
+import pytest
+from pydantic import ValidationError
+
 from meadow.client.schema import FunctionArgSpec, ToolCall, ToolSpec
 
 
@@ -57,6 +60,15 @@ def test_tool_spec_serialization() -> None:
     }
 
     assert tool_spec.model_dump() == expected
+    assert tool_spec.serialize_for_llm() == expected
+
+    # Serialized dicts are copies of the cached dict
+    tool_dict = tool_spec.serialize_for_llm()
+    tool_dict["function"].pop("parameters")
+    tool_dict = tool_spec.model_dump()
+    tool_dict["function"]["parameters"]["required"].append("arg3")
+    assert tool_spec.serialize_for_llm() == expected
+    assert tool_spec.model_dump() == expected
 
 
 def test_tool_arguments() -> None:
@@ -71,7 +83,29 @@ def test_tool_arguments() -> None:
         "arg2": 2,
         "arg3": ["value3"],
     }
+    # Parsed once and not part of the model's fields
+    assert tool_call.arguments is tool_call.arguments
+    assert tool_call == ToolCall(
+        name="test_tool",
+        unparsed_arguments='{"arg1": "value1", "arg2": 2, "arg3": ["value3"]}',
+    )
+    assert "arguments" not in tool_call.model_dump()
+    # Frozen so the parsed arguments can't go stale
+    with pytest.raises(ValidationError):
+        tool_call.unparsed_arguments = '{"arg1": "value2"}'
+    copied_tool_call = tool_call.model_copy()
+    assert copied_tool_call.arguments == tool_call.arguments
+    assert copied_tool_call.arguments is not tool_call.arguments
+    updated_tool_call = tool_call.model_copy(
+        update={"unparsed_arguments": '{"arg1": "value2"}'}
+    )
+    assert updated_tool_call.arguments == {"arg1": "value2"}
 
     # Test parse error is caught
     tool_call = ToolCall(name="test_tool", unparsed_arguments='{"arg1": "value1"')
     assert tool_call.arguments == {}
+
+    # Test blank arguments
+    for unparsed_arguments in ["", "  \n"]:
+        tool_call = ToolCall(name="test_tool", unparsed_arguments=unparsed_arguments)
+        assert tool_call.arguments == {}
@@ -361,3 +361,29 @@ SELECT
   user_id2
 FROM user_view"""
     )
+
+
+def test_schema_version(duckdb_connector: DuckDBConnector) -> None:
+    db = Database(duckdb_connector)
+    version = db.schema_version
+    # Reading the schema does not change the version
+    db.tables
+    assert db.schema_version == version
+    db.add_view("user_view", "SELECT id+2 AS id2, username FROM users WHERE age < 0")
+    assert db.schema_version > version
+    version = db.schema_version
+    db.finalize_draft_views()
+    assert db.schema_version > version
+    version = db.schema_version
+    db.hide_table("users")
+    assert db.schema_version > version
+    version = db.schema_version
+    db.unhide_all_tables()
+    assert db.schema_version > version
+    version = db.schema_version
+    db.remove_view("user_view")
+    assert db.schema_version > version
+    version = db.schema_version
+    # Removing a non-existent view is a no-op
+    db.remove_view("user_view")
+    assert db.schema_version == version
@@ -206,3 +206,55 @@ def test_get_messages_linearly_by_time() -> None:
     assert linear_messages[0].content == "First message"
     assert linear_messages[1].content == "Second message"
     assert linear_messages[2].content == "Third message"
+
+
+def test_get_messages_with_serialized() -> None:
+    """Test getting messages with their serialized dicts."""
+    message_history = MessageHistory()
+    agent_one = Mock(spec=Agent)
+    agent_one.name = "agent_one"
+    assert message_history.get_messages_with_serialized(agent_one) == ([], [])
+    message_one = AgentMessage(
+        content="Hello, world!",
+        agent_role=ClientMessageRole.SENDER,
+        sending_agent="agent_one",
+    )
+    message_two = AgentMessage(
+        content="I'm done",
+        agent_role=ClientMessageRole.RECEIVER,
+        sending_agent="user",
+    )
+    message_three = AgentMessage(
+        content="See ya <exit>",
+        agent_role=ClientMessageRole.SENDER,
+        sending_agent="agent_one",
+        is_termination_message=True,
+    )
+    message_four = AgentMessage(
+        content="Show me cats",
+        agent_role=ClientMessageRole.RECEIVER,
+        sending_agent="user",
+    )
+
+    message_history.add_message(agent_one, ClientMessageRole.SENDER, message_one)
+    message_history.add_message(agent_one, ClientMessageRole.RECEIVER, message_two)
+    message_history.add_message(agent_one, ClientMessageRole.SENDER, message_three)
+    message_history.add_message(agent_one, ClientMessageRole.RECEIVER, message_four)
+
+    messages, serialized_messages = message_history.get_messages_with_serialized(
+        agent_one
+    )
+    assert messages == message_history.get_messages(agent_one)
+    assert serialized_messages == [
+        {"content": "Hello, world!", "role": "assistant"},
+        {"content": "Show me cats", "role": "user"},
+    ]
+    messages, serialized_messages = message_history.get_messages_with_serialized(
+        agent_one, skip_termination_pairs=False
+    )
+    assert messages == message_history.get_messages(
+        agent_one, skip_termination_pairs=False
+    )
+    assert serialized_messages == [
+        m.model_dump(include={"role", "content"}) for m in messages
+    ]